@@ -1,9 +1,28 @@
 import networkx as nx
+import numpy as np
 import hashlib
+import functools
 import random
 import secrets
+import queue
+import threading
 import matplotlib.pyplot as plt
-from typing import Dict
+
+def sample_edge_indices(total, p):
+    # jump between successes with geometric gaps: O(|E|) draws instead of O(total)
+    if p <= 0 or total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    chunks = []
+    last = -1
+    while last < total:
+        gaps = np.random.geometric(min(p, 1.0), size=int(total * p * 1.1) + 16)
+        pos = last + np.cumsum(gaps)
+        chunks.append(pos)
+        last = int(pos[-1])
+
+    idx = np.concatenate(chunks)
+    return idx[idx < total]
 
 def generate_3_colorable_graph(n=1000, p=0.01):
     G = nx.Graph()
@@ -22,23 +41,41 @@ def generate_3_colorable_graph(n=1000, p=0.01):
 
     for a in range(3):
         for b in range(a + 1, 3):
-            for u in groups[a]:
-                for v in groups[b]:
-                    if random.random() < p:
-                        G.add_edge(u, v)
+            group_a = np.asarray(groups[a])
+            group_b = np.asarray(groups[b])
+            idx = sample_edge_indices(len(group_a) * len(group_b), p)
+            ui, vi = np.divmod(idx, len(group_b))
+            G.add_edges_from(zip(group_a[ui].tolist(), group_b[vi].tolist()))
 
-    password_coloring = {node: group for group, nodes in groups.items() for node in nodes}
+    password_coloring = np.empty(n, dtype=np.int8)
+    for group, nodes in groups.items():
+        password_coloring[nodes] = group
 
     return G, password_coloring
 
 
-def draw_local_graph(graph, colors, edge, round_num):
+def graph_to_csr(graph):
+    # edge list as two arrays plus CSR adjacency (indptr, indices) over node ids range(n)
+    n = graph.number_of_nodes()
+    eu, ev = np.asarray(list(graph.edges()), dtype=np.int64).reshape(-1, 2).T
+
+    src = np.concatenate([eu, ev])
+    dst = np.concatenate([ev, eu])
+    indices = dst[np.argsort(src, kind="stable")]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+    return indptr, indices, eu, ev
+
+
+def draw_local_graph(graph, colors, edge, round_num, csr):
     plt.clf()
     u, v = edge
+    indptr, indices = csr
 
     neigh = set([u, v])
-    neigh.update(graph.neighbors(u))
-    neigh.update(graph.neighbors(v))
+    neigh.update(indices[indptr[u]:indptr[u + 1]].tolist())
+    neigh.update(indices[indptr[v]:indptr[v + 1]].tolist())
 
     sub = graph.subgraph(neigh)
     pos = nx.spring_layout(sub, seed=42)
@@ -46,7 +83,7 @@ def draw_local_graph(graph, colors, edge, round_num):
     colormap = {0: "red", 1: "green", 2: "blue"}
 
     nx.draw(sub, pos,
-            node_color=[colormap.get(colors.get(n), "gray") for n in sub.nodes()],
+            node_color=[colormap.get(int(colors[n]), "gray") for n in sub.nodes()],
             edge_color="gray",
             node_size=120)
 
@@ -55,52 +92,173 @@ def draw_local_graph(graph, colors, edge, round_num):
     plt.title(f"Round {round_num} — Zero-Knowledge Proof")
     plt.pause(0.1)
 
-def password_to_coloring(password: str, graph: nx.Graph) -> Dict[int, int]:
-    seed_value = int(hashlib.sha256(password.encode()).hexdigest(), 16)
-    random.seed(seed_value)
-    return {node: random.randint(0, 2) for node in graph.nodes()}
-
-def passwords_match(graph, password_coloring, rounds=20, visualize=True) -> bool:
-    edges = list(graph.edges())
-
-    for r in range(1, rounds + 1):
-        base = [0, 1, 2]
-        random.shuffle(base)
-        perm = {i: base[i] for i in range(3)}
-
-        nonces = {}
-        commitments = {}
-        permuted = {}
-
-        for v in graph.nodes():
-            c = password_coloring[v]
-            pc = perm[c]
-            nonce = secrets.token_hex(16)
-
-            commitments[v] = hashlib.sha256(f"{v}||{pc}||{nonce}".encode()).hexdigest()
-            nonces[v] = nonce
-            permuted[v] = pc
-
-        u, v = random.choice(edges)
-
-        check_u = hashlib.sha256(f"{u}||{permuted[u]}||{nonces[u]}".encode()).hexdigest() == commitments[u]
-        check_v = hashlib.sha256(f"{v}||{permuted[v]}||{nonces[v]}".encode()).hexdigest() == commitments[v]
-        diff = permuted[u] != permuted[v]
-
-        if visualize:
-            draw_local_graph(graph, permuted, (u, v), r)
-
-        if not (check_u and check_v and diff):
+@functools.lru_cache(maxsize=1024)
+def _coloring_from_digest(digest: bytes, n: int) -> np.ndarray:
+    rng = random.Random(int.from_bytes(digest, "big"))
+    coloring = np.fromiter((rng.randint(0, 2) for _ in range(n)), dtype=np.int8, count=n)
+    # cached and shared between callers, so it must not be mutated
+    coloring.flags.writeable = False
+    return coloring
+
+def password_to_coloring(password: str, graph: nx.Graph) -> np.ndarray:
+    # the cache only sees the password's digest and the node count, so it keeps
+    # neither plaintext attempts nor the graph alive
+    digest = hashlib.sha256(password.encode()).digest()
+    return _coloring_from_digest(digest, graph.number_of_nodes())
+
+COLOR_TAGS = (b"0||", b"1||", b"2||")
+
+def commit(v, pc, nonce):
+    return hashlib.sha256(b"%d||" % v + COLOR_TAGS[pc] + nonce).digest()
+
+def verify_edge(u, v, opening_u, opening_v, commit_u, commit_v) -> bool:
+    # the verifier rebuilds both messages from the opened (color, nonce) pairs
+    (pc_u, nonce_u), (pc_v, nonce_v) = opening_u, opening_v
+    return (commit(u, pc_u, nonce_u) == commit_u
+            and commit(v, pc_v, nonce_v) == commit_v
+            and pc_u != pc_v)
+
+def random_permutation(proto_rng):
+    perm = [0, 1, 2]
+    proto_rng.shuffle(perm)
+    return perm
+
+def two_node_round(proto_rng, eu, ev, perm, coloring):
+    # pick the challenge edge, then commit to and open only its two endpoints
+    i = proto_rng.randrange(len(eu))
+    u, v = int(eu[i]), int(ev[i])
+    pc_u, pc_v = perm[coloring[u]], perm[coloring[v]]
+
+    nonces = secrets.token_bytes(32)
+    nonce_u, nonce_v = nonces[:16], nonces[16:]
+    commit_u, commit_v = commit(u, pc_u, nonce_u), commit(v, pc_v, nonce_v)
+
+    return (u, v), verify_edge(u, v, (pc_u, nonce_u), (pc_v, nonce_v), commit_u, commit_v)
+
+def fast_rounds(eu, ev, coloring, rounds) -> bool:
+    # visualization-free round loop; runs the same two-node round as the
+    # default mode of passwords_match
+    proto_rng = secrets.SystemRandom()
+    for _ in range(rounds):
+        _, ok = two_node_round(proto_rng, eu, ev, random_permutation(proto_rng), coloring)
+        if not ok:
             return False
 
     return True
 
+def passwords_match(graph, password_coloring, rounds=20, visualize=True,
+                    simulate_full_commit=False, csr=None) -> bool:
+    # callers that check many passwords against one graph pass graph_to_csr(graph)
+    # once instead of re-listing its edges on every call
+    indptr, indices, eu, ev = csr if csr is not None else graph_to_csr(graph)
+    if not visualize and not simulate_full_commit:
+        return fast_rounds(eu, ev, password_coloring, rounds)
+
+    m = len(eu)
+    # permutations and challenge edges come from the OS, not a seeded Mersenne Twister
+    proto_rng = secrets.SystemRandom()
+
+    # node ids are range(n), so per-node state lives in arrays indexed by node id
+    n = graph.number_of_nodes()
+
+    # A real prover commits to every node before the verifier picks an edge.
+    # This script's verifier only ever opens the two endpoints, so unless
+    # simulate_full_commit is set (honest protocol timing) only u and v are committed.
+    if simulate_full_commit:
+        v_prefixes = [f"{v}||".encode() for v in range(n)]
+        # Every round's messages live in one (n, stride) buffer: node v's row holds
+        # "v||pc||" right-aligned in the first `width` bytes, then its 16-byte nonce.
+        # Prefixes for all (v, pc) pairs are precomputed, indexed by 3 * v + pc.
+        width = max(len(vp) for vp in v_prefixes) + 3
+        stride = width + 16
+        prefix_table = np.zeros((3 * n, width), dtype=np.uint8)
+        for v, vp in enumerate(v_prefixes):
+            for pc, tag in enumerate(COLOR_TAGS):
+                prefix_table[3 * v + pc, width - len(vp) - 3:] = np.frombuffer(vp + tag, dtype=np.uint8)
+        slot_base = 3 * np.arange(n, dtype=np.int64)
+        starts = [v * stride + width - len(vp) - 3 for v, vp in enumerate(v_prefixes)]
+        ends = [(v + 1) * stride for v in range(n)]
+        # reused every round: commitments are hashed out of it before the next fill
+        buf = np.empty((n, stride), dtype=np.uint8)
+        msgs = memoryview(buf).cast("B")
+
+    def commit_batch(msgs):
+        # all commitments of a round are independent, so hash them in one pass
+        return [hashlib.sha256(msgs[start:end]).digest() for start, end in zip(starts, ends)]
+
+    def run_rounds(on_round):
+        for r in range(1, rounds + 1):
+            perm = random_permutation(proto_rng)
+            permuted = np.array(perm, dtype=np.int8)[password_coloring]
+
+            if simulate_full_commit:
+                buf[:, :width] = prefix_table[slot_base + permuted]
+                # one urandom call per round fills every node's nonce
+                buf[:, width:] = np.frombuffer(secrets.token_bytes(16 * n), dtype=np.uint8).reshape(n, 16)
+
+                commitments = commit_batch(msgs)
+
+                i = proto_rng.randrange(m)
+                u, v = int(eu[i]), int(ev[i])
+                pc_u, pc_v = int(permuted[u]), int(permuted[v])
+                nonce_u, nonce_v = bytes(buf[u, width:]), bytes(buf[v, width:])
+                ok = verify_edge(u, v, (pc_u, nonce_u), (pc_v, nonce_v),
+                                 commitments[u], commitments[v])
+            else:
+                (u, v), ok = two_node_round(proto_rng, eu, ev, perm, password_coloring)
+
+            if on_round is not None:
+                on_round(permuted, (u, v), r)
+
+            if not ok:
+                return False
+
+        return True
+
+    def draw(permuted, edge, r):
+        draw_local_graph(graph, permuted, edge, r, (indptr, indices))
+
+    if visualize == "async":
+        # the proof runs in a worker thread and queues its frames; matplotlib is
+        # not thread-safe, so this thread stays the renderer and draws at its own
+        # pace, skipping any frames it fell behind on and finishing with the last one
+        frames = queue.Queue()
+        verdict = []
+        error = []
+
+        def prove():
+            try:
+                verdict.append(run_rounds(lambda *frame: frames.put(frame)))
+            except BaseException as exc:
+                error.append(exc)
+            finally:
+                frames.put(None)
+
+        worker = threading.Thread(target=prove, daemon=True)
+        worker.start()
+        latest = None
+        while (frame := frames.get()) is not None:
+            latest = frame
+            if frames.empty():
+                draw(*latest)
+                latest = None
+        worker.join()
+
+        if error:
+            raise error[0]
+        if latest is not None:
+            draw(*latest)
+        return verdict[0]
+
+    return run_rounds(draw if visualize else None)
+
 
 
 if __name__ == "__main__":
     plt.ion()
 
     graph, correct_coloring = generate_3_colorable_graph()
+    csr = graph_to_csr(graph)
 
     REAL_PASSWORD = "pass"
 
@@ -111,7 +269,7 @@ if __name__ == "__main__":
     else:
         test_coloring = password_to_coloring(entered, graph)
 
-    ok = passwords_match(graph, test_coloring, rounds=40, visualize=True)
+    ok = passwords_match(graph, test_coloring, rounds=40, visualize=True, csr=csr)
 
     if ok:
         print("\nCorrect Password")